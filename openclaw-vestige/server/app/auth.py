@@ -2,69 +2,121 @@
 
 from __future__ import annotations
 
+import hmac
+import json
 import os
-import secrets
 
-from fastapi import Request
-from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
 from starlette.responses import Response
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 # Paths that bypass authentication
-_PUBLIC_PATHS = {"/health", "/readyz", "/docs", "/openapi.json", "/redoc"}
+_PUBLIC_PATHS = frozenset({"/health", "/readyz", "/docs", "/openapi.json", "/redoc"})
 
 
-class BearerAuthMiddleware(BaseHTTPMiddleware):
+def _error_response(detail: str, status_code: int) -> Response:
+    return Response(
+        content=json.dumps({"detail": detail}, ensure_ascii=False).encode(),
+        status_code=status_code,
+        media_type="application/json",
+    )
+
+
+# Rejections are built once at import; a Response only reads its body and
+# headers when sent, so the same instance can serve every request.
+_RESP_401 = _error_response("Invalid or missing bearer token", 401)
+_RESP_500_EMPTY_TOKEN = _error_response(
+    "VESTIGE_AUTH_TOKEN is set but empty — provide a valid token", 500
+)
+_RESP_500_UNCONFIGURED = _error_response(
+    "Authentication not configured. Set VESTIGE_AUTH_TOKEN or "
+    "VESTIGE_ALLOW_ANONYMOUS=true for open access.",
+    500,
+)
+
+
+class BearerAuthMiddleware:
     """Reject requests without a valid Bearer token.
 
-    The expected token is read from the ``VESTIGE_AUTH_TOKEN`` environment
-    variable.  Auth is **required by default**.  To explicitly allow
+    The expected token is passed as ``token`` or, by default, read from the
+    ``VESTIGE_AUTH_TOKEN`` environment variable.  Auth is **required by
+    default**.  To explicitly allow
     unauthenticated access (e.g. local dev), you must:
 
       1. Leave ``VESTIGE_AUTH_TOKEN`` **unset** (not empty), AND
       2. Set ``VESTIGE_ALLOW_ANONYMOUS=true``
 
     An empty-string token is treated as invalid — it does **not** disable auth.
-    Token comparison uses ``secrets.compare_digest`` to prevent timing attacks.
+    Token comparison uses ``hmac.compare_digest`` to prevent timing attacks.
+
+    Public paths (health/readiness probes, API docs) are let through before
+    any configuration checks. The environment is read once when the
+    middleware is built; set ``VESTIGE_AUTH_RELOAD=1`` to re-read it on
+    every request (ignored when ``token`` is passed explicitly).
+
+    Implemented as a plain ASGI middleware rather than ``BaseHTTPMiddleware``
+    so authorized requests are passed straight through without a task group
+    or response bridge.
     """
 
-    async def dispatch(
-        self, request: Request, call_next: RequestResponseEndpoint
-    ) -> Response:
-        # Check if token env var is set (distinguishing unset from empty)
-        token_is_set = "VESTIGE_AUTH_TOKEN" in os.environ
-        expected = os.environ.get("VESTIGE_AUTH_TOKEN", "")
+    def __init__(
+        self,
+        app: ASGIApp,
+        token: str | None = None,
+        allow_anonymous: bool | None = None,
+    ) -> None:
+        self.app = app
+        # None means "take it from the environment"
+        self._token = token
+        self._allow_anonymous = allow_anonymous
+        self._reload = token is None and os.environ.get("VESTIGE_AUTH_RELOAD", "") == "1"
+        self._load_config()
+
+    def _load_config(self) -> None:
+        token = self._token if self._token is not None else os.environ.get("VESTIGE_AUTH_TOKEN")
+        # Distinguish an unset token from an empty one
+        self._token_is_set = token is not None
+        # Compare the whole header value so prefix and token are checked in
+        # a single constant-time comparison
+        self._expected_header: bytes | None = b"Bearer " + token.encode() if token else None
+        if self._allow_anonymous is not None:
+            self._allow_anon = self._allow_anonymous
+        else:
+            self._allow_anon = os.environ.get("VESTIGE_ALLOW_ANONYMOUS", "").lower() == "true"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        rejection = self._check(scope)
+        if rejection is None:
+            await self.app(scope, receive, send)
+        else:
+            await rejection(scope, receive, send)
+
+    def _check(self, scope: Scope) -> Response | None:
+        """Return an error response for the request, or None to let it through."""
+        if scope["path"] in _PUBLIC_PATHS:
+            return None
+
+        if self._reload:
+            self._load_config()
+        expected = self._expected_header
 
         # Treat empty string as "not configured" (same as unset)
-        if token_is_set and not expected:
+        if self._token_is_set and expected is None:
             # Empty token configured — refuse to run in insecure mode
-            return JSONResponse(
-                {"detail": "VESTIGE_AUTH_TOKEN is set but empty — provide a valid token"},
-                status_code=500,
-            )
+            return _RESP_500_EMPTY_TOKEN
 
-        if not token_is_set:
+        if not self._token_is_set:
             # Token is not set at all — check if anonymous access is explicitly allowed
-            allow_anon = os.environ.get("VESTIGE_ALLOW_ANONYMOUS", "").lower() == "true"
-            if allow_anon:
-                return await call_next(request)
-            return JSONResponse(
-                {
-                    "detail": "Authentication not configured. Set VESTIGE_AUTH_TOKEN or "
-                    "VESTIGE_ALLOW_ANONYMOUS=true for open access."
-                },
-                status_code=500,
-            )
-
-        if request.url.path in _PUBLIC_PATHS:
-            return await call_next(request)
-
-        auth = request.headers.get("Authorization", "")
-        if not auth.startswith("Bearer "):
-            return JSONResponse({"detail": "Invalid or missing bearer token"}, status_code=401)
-
-        provided = auth[7:]
-        if not secrets.compare_digest(provided.encode(), expected.encode()):
-            return JSONResponse({"detail": "Invalid or missing bearer token"}, status_code=401)
-
-        return await call_next(request)
+            if self._allow_anon:
+                return None
+            return _RESP_500_UNCONFIGURED
+
+        # ASGI header names are already lower-cased bytes, so scan them
+        # directly instead of building a Headers wrapper
+        auth = next((v for k, v in scope["headers"] if k == b"authorization"), None)
+        if auth is None or not hmac.compare_digest(auth, expected):
+            return _RESP_401
+
+        return None
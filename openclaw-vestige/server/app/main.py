@@ -6,12 +6,15 @@ translates incoming HTTP requests into MCP JSON-RPC tool calls.
 
 from __future__ import annotations
 
+import asyncio
 import logging
 import os
 from contextlib import asynccontextmanager
+from functools import lru_cache
 from typing import Any
 
-from fastapi import FastAPI, Header, HTTPException
+import orjson
+from fastapi import FastAPI, HTTPException, Request, Response
 
 from .auth import BearerAuthMiddleware
 from .mcp_client import MCPClient, MCPError, MCPToolError
@@ -21,6 +24,7 @@ from .models import (
     HealthResponse,
     IngestRequest,
     IntentionRequest,
+    MemoryAction,
     MemoryRequest,
     PromoteRequest,
     SearchRequest,
@@ -31,6 +35,7 @@ from .models import (
 logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO").upper())
 logger = logging.getLogger("vestige.server")
 
+
 # ── MCP client singleton ─────────────────────────────────────────────────────
 
 mcp = MCPClient(
@@ -41,6 +46,10 @@ mcp = MCPClient(
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    # The loop is chosen by the server (e.g. uvicorn --loop), so report the
+    # one that is actually running
+    loop_type = type(asyncio.get_running_loop())
+    logger.info("Event loop: %s.%s", loop_type.__module__, loop_type.__qualname__)
     # Connect to the external Vestige MCP server
     logger.info(
         "Connecting to Vestige MCP at %s (transport=%s)",
@@ -79,31 +88,54 @@ app.add_middleware(BearerAuthMiddleware)
 
 # ── Helpers ───────────────────────────────────────────────────────────────────
 
-def _agent_context(agent_id: str | None, existing_context: str | None = None) -> dict[str, Any]:
-    """Build optional agent context dict.
+@lru_cache(maxsize=1024)
+def _agent_only_context(agent_id: str) -> tuple[tuple[str, str], ...]:
+    # Agent IDs repeat across requests, so the common no-context case is memoized
+    return (("agent_id", agent_id), ("context", f"agent:{agent_id}"))
+
+
+def _agent_context(
+    agent_id: str | None, existing_context: str | None = None
+) -> tuple[tuple[str, str], ...]:
+    """Build optional agent context as ``(key, value)`` pairs for ``dict.update``.
 
     Instead of overwriting the user's context with agent_id, we include
     agent_id as a separate field and preserve the original context.
     """
-    result: dict[str, Any] = {}
-    if existing_context:
-        result["context"] = existing_context
-    if agent_id:
-        result["agent_id"] = agent_id
-        # If there's already a context, prepend agent identity
-        if "context" in result:
-            result["context"] = f"agent:{agent_id} | {result['context']}"
-        else:
-            result["context"] = f"agent:{agent_id}"
-    return result
-
-
-async def _tool(name: str, arguments: dict[str, Any]) -> VestigeResponse:
+    if not agent_id:
+        return (("context", existing_context),) if existing_context else ()
+    if not existing_context:
+        return _agent_only_context(agent_id)
+    # If there's already a context, prepend agent identity
+    return (("context", f"agent:{agent_id} | {existing_context}"), ("agent_id", agent_id))
+
+
+# Tool endpoints serialize their own body; VestigeResponse only documents it
+_TOOL_RESPONSES: dict[int | str, dict[str, Any]] = {200: {"model": VestigeResponse}}
+
+
+def _json(body: dict[str, Any]) -> Response:
+    return Response(content=orjson.dumps(body), media_type="application/json")
+
+
+@lru_cache(maxsize=128)
+def _tool_error_body(message: str) -> bytes:
+    # Tool failures tend to repeat (same missing id, same bad argument)
+    return orjson.dumps({"success": False, "data": None, "error": message})
+
+
+async def _tool(name: str, arguments: dict[str, Any], coalesce: bool = False) -> Response:
+    """Call a Vestige tool. Only read-only tools should set ``coalesce``.
+
+    The result is already plain JSON from the MCP server, so the
+    ``VestigeResponse`` envelope is written directly instead of being
+    validated and re-serialized through a response model.
+    """
     try:
-        result = await mcp.call_tool(name, arguments)
-        return VestigeResponse(success=True, data=result)
+        result = await mcp.call_tool(name, arguments, coalesce=coalesce)
+        return _json({"success": True, "data": result, "error": None})
     except MCPToolError as exc:
-        return VestigeResponse(success=False, error=str(exc))
+        return Response(content=_tool_error_body(str(exc)), media_type="application/json")
     except MCPError as exc:
         raise HTTPException(status_code=502, detail=str(exc))
 
@@ -134,107 +166,66 @@ async def readyz():
     return {"ready": True}
 
 
-@app.post("/search", response_model=VestigeResponse)
-async def search(
-    req: SearchRequest,
-    x_agent_id: str | None = Header(None, alias="X-Agent-Id"),
-):
-    args: dict[str, Any] = {
-        "query": req.query,
-        "mode": req.mode.value,
-        "limit": req.limit,
-    }
-    if req.threshold is not None:
-        args["threshold"] = req.threshold
-    args.update(_agent_context(x_agent_id))
-    return await _tool("search", args)
-
-
-@app.post("/ingest", response_model=VestigeResponse)
-async def ingest(
-    req: IngestRequest,
-    x_agent_id: str | None = Header(None, alias="X-Agent-Id"),
-):
-    args: dict[str, Any] = {
-        "content": req.content,
-        "node_type": req.node_type,
-        "tags": req.tags,
-    }
-    args.update(_agent_context(x_agent_id, req.context))
+@app.post("/search", responses=_TOOL_RESPONSES)
+async def search(req: SearchRequest, request: Request):
+    args = req.model_dump(mode="json", exclude_none=True)
+    args.update(_agent_context(request.headers.get("x-agent-id")))
+    return await _tool("search", args, coalesce=True)
+
+
+@app.post("/ingest", responses=_TOOL_RESPONSES)
+async def ingest(req: IngestRequest, request: Request):
+    args = req.model_dump(mode="json", exclude_none=True)
+    if not req.context:
+        args.pop("context", None)
+    args.update(_agent_context(request.headers.get("x-agent-id"), req.context))
     return await _tool("ingest", args)
 
 
-@app.post("/smart_ingest", response_model=VestigeResponse)
-async def smart_ingest(
-    req: SmartIngestRequest,
-    x_agent_id: str | None = Header(None, alias="X-Agent-Id"),
-):
-    args: dict[str, Any] = {
-        "content": req.content,
-        "node_type": req.node_type,
-        "tags": req.tags,
-    }
-    args.update(_agent_context(x_agent_id, req.context))
+@app.post("/smart_ingest", responses=_TOOL_RESPONSES)
+async def smart_ingest(req: SmartIngestRequest, request: Request):
+    args = req.model_dump(mode="json", exclude_none=True)
+    if not req.context:
+        args.pop("context", None)
+    args.update(_agent_context(request.headers.get("x-agent-id"), req.context))
     return await _tool("smart_ingest", args)
 
 
-@app.post("/promote", response_model=VestigeResponse)
-async def promote(
-    req: PromoteRequest,
-    x_agent_id: str | None = Header(None, alias="X-Agent-Id"),
-):
-    args: dict[str, Any] = {"memory_id": req.memory_id}
-    args.update(_agent_context(x_agent_id))
+@app.post("/promote", responses=_TOOL_RESPONSES)
+async def promote(req: PromoteRequest, request: Request):
+    args = req.model_dump(mode="json", exclude_none=True)
+    args.update(_agent_context(request.headers.get("x-agent-id")))
     return await _tool("promote_memory", args)
 
 
-@app.post("/demote", response_model=VestigeResponse)
-async def demote(
-    req: DemoteRequest,
-    x_agent_id: str | None = Header(None, alias="X-Agent-Id"),
-):
-    args: dict[str, Any] = {"memory_id": req.memory_id}
-    args.update(_agent_context(x_agent_id))
+@app.post("/demote", responses=_TOOL_RESPONSES)
+async def demote(req: DemoteRequest, request: Request):
+    args = req.model_dump(mode="json", exclude_none=True)
+    args.update(_agent_context(request.headers.get("x-agent-id")))
     return await _tool("demote_memory", args)
 
 
-@app.post("/memory", response_model=VestigeResponse)
-async def memory(
-    req: MemoryRequest,
-    x_agent_id: str | None = Header(None, alias="X-Agent-Id"),
-):
-    args: dict[str, Any] = {
-        "action": req.action.value,
-        "memory_id": req.memory_id,
-    }
-    args.update(_agent_context(x_agent_id))
-    return await _tool("memory", args)
-
-
-@app.post("/codebase", response_model=VestigeResponse)
-async def codebase(
-    req: CodebaseRequest,
-    x_agent_id: str | None = Header(None, alias="X-Agent-Id"),
-):
-    args: dict[str, Any] = {
-        "content": req.content,
-        "pattern_type": req.pattern_type,
-        "tags": req.tags,
-    }
-    args.update(_agent_context(x_agent_id, req.context))
+@app.post("/memory", responses=_TOOL_RESPONSES)
+async def memory(req: MemoryRequest, request: Request):
+    args = req.model_dump(mode="json", exclude_none=True)
+    args.update(_agent_context(request.headers.get("x-agent-id")))
+    return await _tool("memory", args, coalesce=req.action is MemoryAction.get)
+
+
+@app.post("/codebase", responses=_TOOL_RESPONSES)
+async def codebase(req: CodebaseRequest, request: Request):
+    args = req.model_dump(mode="json", exclude_none=True)
+    if not req.context:
+        args.pop("context", None)
+    args.update(_agent_context(request.headers.get("x-agent-id"), req.context))
     return await _tool("codebase", args)
 
 
-@app.post("/intention", response_model=VestigeResponse)
-async def intention(
-    req: IntentionRequest,
-    x_agent_id: str | None = Header(None, alias="X-Agent-Id"),
-):
-    args: dict[str, Any] = {
-        "content": req.content,
-        "tags": req.tags,
-    }
-    if req.trigger:
-        args["trigger"] = req.trigger
-    args.update(_agent_context(x_agent_id))
+@app.post("/intention", responses=_TOOL_RESPONSES)
+async def intention(req: IntentionRequest, request: Request):
+    args = req.model_dump(mode="json", exclude_none=True)
+    # An empty trigger means "no trigger", not a trigger matching ""
+    if not req.trigger:
+        args.pop("trigger", None)
+    args.update(_agent_context(request.headers.get("x-agent-id")))
     return await _tool("intention", args)
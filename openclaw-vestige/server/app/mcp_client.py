@@ -16,21 +16,120 @@ Supported transports:
 
 from __future__ import annotations
 
-import json
+import asyncio
+import graphlib
+import hashlib
+import itertools
 import logging
 import os
 import time
-from typing import Any
+from collections import OrderedDict
+from collections.abc import Callable
+from contextlib import AsyncExitStack
+from pathlib import Path
+from typing import Any, NotRequired, TypedDict
 
 import httpx
+import msgspec
+import orjson
 
 logger = logging.getLogger("vestige.mcp")
 
+# Outbound messages and the tool cache file use orjson; replies are decoded
+# into typed structs with msgspec below.
+_loads = orjson.loads
+_dumps = orjson.dumps
+
+_JSONRPC = "2.0"
+
+
+# ── Wire types ────────────────────────────────────────────────────────────────
+
+class JsonRpcResponse(msgspec.Struct, omit_defaults=True):
+    """A JSON-RPC 2.0 reply. ``result`` is kept as raw JSON until a caller
+    decodes it into the shape it expects."""
+
+    jsonrpc: str = _JSONRPC
+    id: int | str | None = None
+    result: msgspec.Raw = msgspec.Raw()
+    error: dict | None = None
+
+
+class ToolsCallResult(msgspec.Struct):
+    """The ``result`` of a ``tools/call`` request."""
+
+    content: list = []
+    isError: bool = False
+
+
+class PlanStep(TypedDict):
+    """One step of a :meth:`MCPClient.call_tools_plan` plan.
+
+    Any ``{"$ref": "<step_id>.<path>"}`` object inside ``arguments`` is
+    replaced with that step's result (or the dotted path within it) before
+    the call is made.
+    """
+
+    id: str
+    name: str
+    arguments: dict[str, Any]
+    deps: NotRequired[list[str]]
+
+
+_decode_reply = msgspec.json.Decoder(JsonRpcResponse | list[JsonRpcResponse]).decode
+_decode_tools_call = msgspec.json.Decoder(ToolsCallResult).decode
+_decode_any = msgspec.json.Decoder().decode
+
+# Start of an SSE ``data:`` line; bodies are scanned with bytes.find
+_SSE_DATA = b"\ndata:"
+_JSON_START = (b"{", b"[")
+# JSON-RPC "Invalid Request" error code
+_INVALID_REQUEST = -32600
+
 # ── Configuration ─────────────────────────────────────────────────────────────
 
 VESTIGE_MCP_URL = os.environ.get("VESTIGE_MCP_URL", "http://localhost:3100/mcp")
 VESTIGE_TRANSPORT = os.environ.get("VESTIGE_TRANSPORT", "streamable_http")
 REQUEST_TIMEOUT = float(os.environ.get("VESTIGE_REQUEST_TIMEOUT", "30"))
+# Persistent tools/list cache; set to an empty string to disable.
+TOOL_CACHE_PATH = os.environ.get(
+    "VESTIGE_TOOL_CACHE", "~/.cache/openclaw-vestige/mcp_tools.json"
+)
+PROTOCOL_VERSION = "2025-03-26"
+# Upper bound on concurrent requests. Over https this matches the common
+# HTTP/2 SETTINGS_MAX_CONCURRENT_STREAMS default; over plain http each
+# in-flight request holds its own HTTP/1.1 connection from the pool.
+MAX_INFLIGHT = int(os.environ.get("VESTIGE_MAX_INFLIGHT", "100"))
+# Collect tools/call requests issued within this many milliseconds into one
+# JSON-RPC batch POST. Unset disables batching; 0 batches calls made in the
+# same event loop tick.
+_batch_window_env = os.environ.get("VESTIGE_BATCH_WINDOW_MS", "")
+BATCH_WINDOW: float | None = float(_batch_window_env) / 1000 if _batch_window_env else None
+
+# Read-only tools whose results may be served from memory for
+# RESULT_CACHE_TTL seconds, e.g. "search,memory". Empty disables the cache.
+CACHEABLE_TOOLS = frozenset(
+    t.strip() for t in os.environ.get("VESTIGE_CACHE_TOOLS", "").split(",") if t.strip()
+)
+RESULT_CACHE_TTL = float(os.environ.get("VESTIGE_CACHE_TTL", "60"))
+RESULT_CACHE_SIZE = 256
+
+# Times the HTTP transport retries a failed TCP connect before giving up.
+CONNECT_RETRIES = 2
+
+# Connection pool tuning. The bridge issues many small POSTs to a single MCP
+# endpoint, so keep connections warm. httpx only negotiates HTTP/2 over TLS
+# (ALPN), so requests are multiplexed for https:// endpoints; the default
+# http://localhost endpoint uses HTTP/1.1 keep-alive connections.
+_POOL_LIMITS = httpx.Limits(
+    max_connections=128,
+    max_keepalive_connections=64,
+    keepalive_expiry=60.0,
+)
+_BASE_HEADERS = {
+    "Accept": "application/json, text/event-stream",
+    "Content-Type": "application/json",
+}
 
 
 class MCPClient:
@@ -45,59 +144,178 @@ class MCPClient:
         url: str | None = None,
         transport: str | None = None,
         timeout: float | None = None,
+        max_inflight: int | None = None,
+        batch_window: float | None = BATCH_WINDOW,
+        cacheable: frozenset[str] | None = None,
+        cache_ttl: float | None = None,
     ):
         self.url = url or VESTIGE_MCP_URL
         self.transport = transport or VESTIGE_TRANSPORT
         self.timeout = timeout or REQUEST_TIMEOUT
-        self._req_id = 0
+        # URL and transport are fixed for the client's lifetime
+        self._rpc_url = self._request_url()
+        # next() on itertools.count is atomic, so concurrent callers never
+        # share a request id
+        self._id_counter = itertools.count(1)
+        self._inflight_limit = asyncio.Semaphore(max_inflight or MAX_INFLIGHT)
+        # In-flight tools/call tasks keyed by (name, canonical arguments)
+        self._inflight: dict[tuple[str, bytes], asyncio.Future] = {}
+        # Recent results of allowlisted tools: key -> (monotonic time, result)
+        self._cacheable = CACHEABLE_TOOLS if cacheable is None else cacheable
+        self._cache_ttl = RESULT_CACHE_TTL if cache_ttl is None else cache_ttl
+        self._results: OrderedDict[tuple[str, bytes], tuple[float, Any]] = OrderedDict()
+        # tools/call requests waiting to be flushed as one JSON-RPC batch
+        self._batch_window = batch_window
+        self._pending: list[tuple[dict, asyncio.Future]] = []
+        self._flush_handle: asyncio.Handle | None = None
+        self._flush_tasks: set[asyncio.Task] = set()
+        # Serializes reconnects so N stale callers trigger one initialize
+        self._reconnect_lock = asyncio.Lock()
         self._client: httpx.AsyncClient | None = None
         self._connected = False
         self._connected_at: float = 0.0
         self._tools: list[dict] = []
         self._available_tool_names: list[str] = []
+        self._tools_digest: bytes | None = None  # sha256 of the last tools/list result
         self._session_id: str | None = None  # Mcp-Session-Id for stateful mode
+        self._tool_cache_key: str | None = None
 
     # ── lifecycle ──────────────────────────────────────────────────────────
 
+    def _new_client(self) -> httpx.AsyncClient:
+        """Build the HTTP client shared by all requests from this instance.
+
+        Request headers, including Mcp-Session-Id once a session exists, are
+        client defaults so individual requests never pass ``headers=``.
+        """
+        headers = dict(_BASE_HEADERS)
+        if self._session_id:
+            headers["Mcp-Session-Id"] = self._session_id
+        # The transport retries failed TCP connects (e.g. while vestige-mcp
+        # restarts) before the error ever reaches _post_payload. http2=True
+        # takes effect for https:// URLs only; plain http stays on HTTP/1.1.
+        transport = httpx.AsyncHTTPTransport(
+            http2=True, limits=_POOL_LIMITS, retries=CONNECT_RETRIES
+        )
+        return httpx.AsyncClient(
+            transport=transport,
+            timeout=self.timeout,
+            headers=headers,
+        )
+
     async def connect(self) -> None:
         """Initialize the HTTP client and perform MCP handshake with vestige-mcp."""
-        self._client = httpx.AsyncClient(timeout=self.timeout)
+        # Reconnects reuse the existing client so its connection pool stays warm
+        if self._client is None:
+            self._client = self._new_client()
+        # initialize starts a new session; sending a stale Mcp-Session-Id
+        # with it would just earn another 404.
+        self._set_session_id(None)
 
         # MCP initialize handshake
         resp = await self._send(
             "initialize",
             {
                 # Must match vestige-mcp's MCP_VERSION in protocol/types.rs
-                "protocolVersion": "2025-03-26",
+                "protocolVersion": PROTOCOL_VERSION,
                 "capabilities": {},
                 "clientInfo": {"name": "openclaw-vestige-bridge", "version": "0.2.0"},
             },
         )
         self._tools = resp.get("capabilities", {}).get("tools", [])
 
-        # Send initialized notification (no id → notification)
-        await self._send_notification("notifications/initialized", {})
         self._connected = True
         self._connected_at = time.monotonic()
         logger.info("MCP initialized via %s – capabilities report %d tools", self.transport, len(self._tools))
 
-        # Discover actual tool names via tools/list
-        await self._discover_tools()
+        # Spec-conforming servers advertise {"listChanged": ...} here, but if
+        # the capabilities already carry the tool list there is no need to ask.
+        if (
+            isinstance(self._tools, list)
+            and self._tools
+            and all(isinstance(t, dict) and "name" in t for t in self._tools)
+        ):
+            self._set_tool_names({"tools": self._tools})
+            await self._send_notification("notifications/initialized", {})
+            return
+
+        # The tool catalog only changes when the server does, so reuse the
+        # cached tools/list result for the same URL + server version.
+        server_version = resp.get("serverInfo", {}).get("version", "")
+        self._tool_cache_key = hashlib.sha256(
+            f"{self.url}|{resp.get('protocolVersion', PROTOCOL_VERSION)}|{server_version}".encode()
+        ).hexdigest()
+        cached = self._load_tool_cache()
+        if cached is not None:
+            self._available_tool_names = cached
+            self._tools_digest = None
+            logger.info("Vestige tools loaded from cache (%d)", len(cached))
+            await self._send_notification("notifications/initialized", {})
+            return
+
+        # initialize must be sent on its own, but the initialized notification
+        # and tools/list can share one POST as a JSON-RPC batch.
+        await self._finish_handshake()
+        if self._available_tool_names:
+            self._save_tool_cache()
+
+    async def _finish_handshake(self) -> None:
+        """Send notifications/initialized and tools/list in a single round-trip."""
+        notification = {"jsonrpc": _JSONRPC, "method": "notifications/initialized", "params": {}}
+        list_req = self._next_request("tools/list", {})
+        try:
+            replies = await self._post_jsonrpc_batch([notification, list_req])
+        except MCPConnectionError:
+            raise
+        except MCPError as exc:
+            # Server does not accept batches — fall back to sequential requests
+            logger.warning("Batched handshake rejected, falling back to sequential requests: %s", exc)
+            self._batch_window = None
+            await self._send_notification("notifications/initialized", {})
+            await self._discover_tools()
+            return
+
+        reply = replies.get(list_req["id"])
+        try:
+            if reply is None:
+                raise MCPError(f"No tools/list response in batch: {list(replies.values())}")
+            self._apply_tools_list(self._unwrap(reply))
+        except MCPError as exc:
+            logger.warning("Failed to list tools (non-fatal): %s", exc)
+            self._available_tool_names = []
+            self._tools_digest = None
 
     async def _discover_tools(self) -> None:
         """Call tools/list to discover the actual tool names from Vestige."""
         try:
-            resp = await self._send("tools/list", {})
-            tools = resp.get("tools", [])
-            self._available_tool_names = [t.get("name", "") for t in tools]
-            logger.info(
-                "Vestige tools discovered (%d): %s",
-                len(self._available_tool_names),
-                ", ".join(self._available_tool_names),
-            )
+            self._apply_tools_list(await self._send_raw("tools/list", {}))
         except MCPError as exc:
             logger.warning("Failed to list tools (non-fatal): %s", exc)
             self._available_tool_names = []
+            self._tools_digest = None
+
+    def _apply_tools_list(self, raw: msgspec.Raw) -> None:
+        """Record tool names from a raw tools/list result unless it is unchanged.
+
+        Health checks and reconnects fetch the same catalog over and over, so
+        a digest of the raw bytes lets them skip decoding it again.
+        """
+        digest = hashlib.sha256(raw).digest()
+        if digest == self._tools_digest:
+            return
+        self._set_tool_names(self._decode_result(raw))
+        self._tools_digest = digest
+
+    def _set_tool_names(self, resp: dict) -> None:
+        """Record tool names from a tools/list result."""
+        tools = resp.get("tools", [])
+        self._available_tool_names = [t.get("name", "") for t in tools]
+        self._tools_digest = None
+        logger.info(
+            "Vestige tools discovered (%d): %s",
+            len(self._available_tool_names),
+            _LazyJoin(self._available_tool_names),
+        )
 
     async def disconnect(self) -> None:
         """Close the HTTP client."""
@@ -105,7 +323,7 @@ class MCPClient:
             await self._client.aclose()
             self._client = None
         self._connected = False
-        self._session_id = None
+        self._set_session_id(None)
         logger.info("MCP client disconnected")
 
     @property
@@ -130,8 +348,9 @@ class MCPClient:
         """
         try:
             if not self._client:
-                self._client = httpx.AsyncClient(timeout=self.timeout)
-            await self._send("tools/list", {})
+                # Full handshake rather than an unconfigured, unsessioned client
+                await self.connect()
+            self._apply_tools_list(await self._send_raw("tools/list", {}))
             return True
         except Exception as exc:
             logger.warning("Vestige health check failed: %s", exc)
@@ -139,63 +358,338 @@ class MCPClient:
 
     async def ensure_connected(self) -> None:
         """Reconnect if the connection has been lost or the session is stale."""
-        if not self.alive:
-            logger.warning("Vestige connection lost – reconnecting")
-            await self.connect()
-        elif self._session_id is None and self._connected:
-            # Connected but no session ID — re-initialize
-            logger.warning("No MCP session ID — re-initializing")
+        if self.alive and self._session_id is not None:
+            return
+        # Single-flight: concurrent callers wait for one handshake instead of
+        # each sending initialize
+        async with self._reconnect_lock:
+            if not self.alive:
+                logger.warning("Vestige connection lost – reconnecting")
+                await self.connect()
+            elif self._session_id is None:
+                # Connected but no session ID — re-initialize
+                logger.warning("No MCP session ID — re-initializing")
+                await self.connect()
+
+    async def _renew_session(self, stale_session_id: str | None) -> None:
+        """Redo the handshake after ``stale_session_id`` expired, once for all callers."""
+        async with self._reconnect_lock:
+            if self.alive and self._session_id is not None and self._session_id != stale_session_id:
+                # Another caller already reconnected while we waited
+                return
+            logger.warning("Stale MCP session detected — reconnecting and retrying")
+            self._connected = False
+            self._set_session_id(None)
             await self.connect()
 
+    # ── tool catalog cache ────────────────────────────────────────────────
+
+    @staticmethod
+    def _tool_cache_file() -> Path | None:
+        return Path(TOOL_CACHE_PATH).expanduser() if TOOL_CACHE_PATH else None
+
+    def _read_tool_cache(self) -> dict[str, list[str]]:
+        path = self._tool_cache_file()
+        if path is None:
+            return {}
+        try:
+            data = _loads(path.read_bytes())
+        except (OSError, orjson.JSONDecodeError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def _load_tool_cache(self) -> list[str] | None:
+        """Return cached tool names for the current server, if any."""
+        names = self._read_tool_cache().get(self._tool_cache_key or "")
+        return list(names) if names else None
+
+    def _save_tool_cache(self) -> None:
+        """Write the discovered tool names through to the on-disk cache."""
+        path = self._tool_cache_file()
+        if path is None or not self._tool_cache_key:
+            return
+        data = self._read_tool_cache()
+        data[self._tool_cache_key] = self._available_tool_names
+        self._write_tool_cache(path, data)
+
+    def _invalidate_tool_cache(self) -> None:
+        """Drop the cache entry for the current server."""
+        path = self._tool_cache_file()
+        data = self._read_tool_cache()
+        if path is None or data.pop(self._tool_cache_key or "", None) is None:
+            return
+        self._write_tool_cache(path, data)
+
+    @staticmethod
+    def _write_tool_cache(path: Path, data: dict[str, list[str]]) -> None:
+        """Replace the cache file atomically so concurrent readers (e.g. other
+        uvicorn workers) never see a partial write."""
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp.write_bytes(_dumps(data))
+            os.replace(tmp, path)
+        except OSError as exc:
+            logger.debug("Could not write tool cache %s: %s", path, exc)
+            tmp.unlink(missing_ok=True)
+
     # ── tool invocation ───────────────────────────────────────────────────
 
-    async def call_tool(self, name: str, arguments: dict[str, Any]) -> Any:
+    async def call_tool(self, name: str, arguments: dict[str, Any], coalesce: bool = True) -> Any:
         """Call an MCP tool and return the parsed result content.
 
         Automatically retries once on stale session errors by reconnecting.
+        With ``coalesce`` (the default), concurrent calls with the same name
+        and arguments share a single request; pass ``coalesce=False`` for
+        tools with side effects. Tools in the ``cacheable`` allowlist are
+        additionally answered from memory for ``cache_ttl`` seconds.
         """
-        await self.ensure_connected()
+        cacheable = name in self._cacheable
+        if not (coalesce or cacheable):
+            return await self._call_tool(name, arguments)
+        key = (name, _dumps(arguments, option=orjson.OPT_SORT_KEYS))
+        if cacheable:
+            hit = self._results.get(key)
+            if hit is not None and time.monotonic() - hit[0] < self._cache_ttl:
+                self._results.move_to_end(key)
+                return hit[1]
+        if coalesce:
+            task = self._inflight.get(key)
+            if task is None:
+                task = asyncio.ensure_future(self._call_tool(name, arguments))
+                self._inflight[key] = task
+                task.add_done_callback(lambda _: self._inflight.pop(key, None))
+            # Shield so one caller cancelling does not cancel the shared request
+            result = await asyncio.shield(task)
+        else:
+            result = await self._call_tool(name, arguments)
+        if cacheable:
+            self._results[key] = (time.monotonic(), result)
+            self._results.move_to_end(key)
+            if len(self._results) > RESULT_CACHE_SIZE:
+                self._results.popitem(last=False)
+        return result
+
+    async def _call_tool(self, name: str, arguments: dict[str, Any]) -> Any:
+        # Same test as ensure_connected(), inlined so a healthy session does
+        # not pay for an extra coroutine on every call
+        session_id = self._session_id
         try:
-            resp = await self._send("tools/call", {"name": name, "arguments": arguments})
+            if not (self._connected and self._client is not None and self._session_id is not None):
+                await self.ensure_connected()
+                session_id = self._session_id
+            raw = await self._send_batched("tools/call", {"name": name, "arguments": arguments})
         except MCPError as exc:
             # Detect stale session ID errors and retry with a fresh connection
             err_msg = str(exc).lower()
-            if "session" in err_msg and ("invalid" in err_msg or "not found" in err_msg or "no valid" in err_msg):
-                logger.warning("Stale MCP session detected — reconnecting and retrying")
-                self._connected = False
-                self._session_id = None
-                await self.connect()
-                resp = await self._send("tools/call", {"name": name, "arguments": arguments})
+            if isinstance(exc, MCPSessionError) or "session" in err_msg and ("invalid" in err_msg or "not found" in err_msg or "no valid" in err_msg):
+                await self._renew_session(session_id)
+                raw = await self._send_batched("tools/call", {"name": name, "arguments": arguments})
+            elif "unknown tool" in err_msg:
+                # Cached catalog may be stale — force tools/list on next connect
+                self._invalidate_tool_cache()
+                raise
             else:
                 raise
+        return self._tool_result(raw)
+
+    @staticmethod
+    def _tool_result(raw: msgspec.Raw) -> dict[str, Any]:
+        """Decode a tools/call ``result``, raising MCPToolError if it failed."""
         # MCP tools/call returns { content: [...] } or { isError: true, content: [...] }
-        if resp.get("isError"):
-            texts = [c.get("text", "") for c in resp.get("content", [])]
+        try:
+            resp = _decode_tools_call(raw) if raw else ToolsCallResult()
+        except msgspec.DecodeError as exc:
+            raise MCPError(f"Malformed tools/call result from Vestige: {exc}") from exc
+        if resp.isError:
+            texts = [c.get("text", "") for c in resp.content]
             raise MCPToolError(" ".join(texts))
         # Extract content array from result for proper response handling
-        content = resp.get("content", [])
-        return {"content": content}
+        return {"content": resp.content}
+
+    async def call_tools_many(
+        self, calls: list[tuple[str, dict[str, Any]]], coalesce: bool = False
+    ) -> list[Any]:
+        """Run independent tool calls concurrently, returning results in order.
+
+        Requests share the connection pool (multiplexed over one HTTP/2
+        connection for https endpoints), bounded by ``max_inflight``. The
+        first failure is raised. Identical calls are each sent unless
+        ``coalesce`` is set, since two identical ingests mean two writes.
+        """
+        return list(
+            await asyncio.gather(*(self.call_tool(name, args, coalesce=coalesce) for name, args in calls))
+        )
+
+    async def call_tools(self, calls: list[tuple[str, dict[str, Any]]]) -> list[Any]:
+        """Send several tool calls as one JSON-RPC batch POST, returning results in order.
+
+        Unlike :meth:`call_tools_many`, this does not depend on
+        ``batch_window``. Falls back to concurrent single requests if the
+        server rejects the batch. The first failure is raised.
+        """
+        # Every call is sent, even identical ones: a batch of two ingests
+        # means two memories, so nothing here is coalesced
+        if len(calls) < 2:
+            return [await self.call_tool(name, args, coalesce=False) for name, args in calls]
+        if not (self._connected and self._client is not None and self._session_id is not None):
+            await self.ensure_connected()
+        session_id = self._session_id
+        msgs = [
+            self._next_request("tools/call", {"name": name, "arguments": args})
+            for name, args in calls
+        ]
+        try:
+            try:
+                replies = await self._post_jsonrpc_batch(msgs)
+            except MCPSessionError:
+                # The expired session ran nothing, so retry the batch once
+                await self._renew_session(session_id)
+                replies = await self._post_jsonrpc_batch(msgs)
+        except MCPRejectedError as exc:
+            # Only a refused batch is resent: after a 5xx the calls may
+            # already have run
+            logger.warning("Batched tools/call rejected, sending individually: %s", exc)
+            return list(
+                await asyncio.gather(*(self.call_tool(name, args, coalesce=False) for name, args in calls))
+            )
+        results = []
+        for msg in msgs:
+            reply = replies.get(msg["id"])
+            if reply is None:
+                raise MCPError(f"No response for request {msg['id']} in batch")
+            results.append(self._tool_result(self._unwrap(reply)))
+        return results
+
+    async def call_tools_plan(self, steps: list[PlanStep]) -> dict[str, Any]:
+        """Run a DAG of tool calls, parallelizing each dependency layer.
+
+        Steps whose ``deps`` have all completed run concurrently, so total
+        time tracks the plan's critical path rather than the sum of its
+        steps. Returns each step's result keyed by step id.
+        """
+        by_id = {step["id"]: step for step in steps}
+        graph = {step["id"]: step.get("deps", []) for step in steps}
+        unknown = {dep for deps in graph.values() for dep in deps} - by_id.keys()
+        if unknown:
+            raise ValueError(f"Plan references unknown steps: {sorted(unknown)}")
+
+        sorter = graphlib.TopologicalSorter(graph)
+        sorter.prepare()
+        results: dict[str, Any] = {}
+        while sorter.is_active():
+            layer = sorter.get_ready()
+            outputs = await asyncio.gather(*(
+                self.call_tool(
+                    by_id[step_id]["name"],
+                    _resolve_refs(by_id[step_id]["arguments"], results),
+                    coalesce=False,
+                )
+                for step_id in layer
+            ))
+            results.update(zip(layer, outputs))
+            sorter.done(*layer)
+        return results
 
     # ── low-level JSON-RPC over HTTP ──────────────────────────────────────
 
-    async def _send(self, method: str, params: dict) -> dict:
-        """Send a JSON-RPC request and return the result."""
-        self._req_id += 1
-        msg = {
-            "jsonrpc": "2.0",
-            "id": self._req_id,
+    def _next_request(self, method: str, params: dict) -> dict:
+        """Build a JSON-RPC request envelope with a fresh id."""
+        return {
+            "jsonrpc": _JSONRPC,
+            "id": next(self._id_counter),
             "method": method,
             "params": params,
         }
-        return await self._post_jsonrpc(msg)
+
+    async def _send(self, method: str, params: dict) -> dict:
+        """Send a JSON-RPC request and return the result."""
+        return self._decode_result(await self._send_raw(method, params))
+
+    async def _send_raw(self, method: str, params: dict) -> msgspec.Raw:
+        """Send a JSON-RPC request and return the undecoded result."""
+        return await self._post_jsonrpc(self._next_request(method, params))
+
+    async def _send_batched(self, method: str, params: dict) -> msgspec.Raw:
+        """Like :meth:`_send_raw`, but queue the request for the next batch POST.
+
+        Falls back to a direct request when batching is disabled.
+        """
+        if self._batch_window is None:
+            return await self._send_raw(method, params)
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        self._pending.append((self._next_request(method, params), fut))
+        if self._flush_handle is None:
+            if self._batch_window > 0:
+                self._flush_handle = loop.call_later(self._batch_window, self._flush)
+            else:
+                self._flush_handle = loop.call_soon(self._flush)
+        return await fut
+
+    def _flush(self) -> None:
+        self._flush_handle = None
+        batch, self._pending = self._pending, []
+        task = asyncio.ensure_future(self._flush_batch(batch))
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+
+    async def _flush_batch(self, batch: list[tuple[dict, asyncio.Future]]) -> None:
+        """POST queued requests and resolve each caller's future by id."""
+        if len(batch) == 1:
+            # Nothing to amortize — send it as a plain request
+            await self._flush_one(*batch[0])
+            return
+
+        try:
+            replies = await self._post_jsonrpc_batch([msg for msg, _ in batch])
+        except MCPRejectedError as exc:
+            # Server does not accept batches — stop batching and send these
+            # individually, as call_tools() does. Only a refused batch is
+            # resent: after a 5xx the calls may already have run.
+            logger.warning("Batched requests rejected, sending individually: %s", exc)
+            self._batch_window = None
+            await asyncio.gather(*(self._flush_one(msg, fut) for msg, fut in batch))
+            return
+        except Exception as exc:
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(exc)
+            return
+        for msg, fut in batch:
+            if fut.done():
+                continue
+            reply = replies.get(msg["id"])
+            if reply is None:
+                fut.set_exception(MCPError(f"No response for request {msg['id']} in batch"))
+                continue
+            try:
+                fut.set_result(self._unwrap(reply))
+            except MCPError as exc:
+                fut.set_exception(exc)
+
+    async def _flush_one(self, msg: dict, fut: asyncio.Future) -> None:
+        """POST a single queued request and resolve its caller's future."""
+        try:
+            result = await self._post_jsonrpc(msg)
+        except Exception as exc:
+            if not fut.done():
+                fut.set_exception(exc)
+        else:
+            if not fut.done():
+                fut.set_result(result)
 
     async def _send_notification(self, method: str, params: dict) -> None:
-        """Send a JSON-RPC notification (no id, no response expected)."""
-        msg = {"jsonrpc": "2.0", "method": method, "params": params}
+        """Send a JSON-RPC notification (no id, no response expected).
+
+        Awaited rather than backgrounded: notifications/initialized must
+        reach the server before any request that follows the handshake.
+        """
+        msg = {"jsonrpc": _JSONRPC, "method": method, "params": params}
         await self._post_jsonrpc_notification(msg)
 
     @staticmethod
-    def _parse_sse_json(text: str) -> dict | list | None:
+    def _parse_sse_json(body: bytes) -> JsonRpcResponse | list[JsonRpcResponse] | None:
         """Extract JSON data from an SSE-formatted response.
 
         When the client sends Accept: text/event-stream (or the server chooses
@@ -207,114 +701,176 @@ class MCPClient:
         path is rarely hit — vestige-mcp returns plain JSON by default.
         Kept for backward compatibility.
         """
-        results = []
-        for line in text.splitlines():
-            line = line.strip()
-            if line.startswith("data:"):
-                payload = line[5:].strip()
-                if payload:
-                    try:
-                        results.append(json.loads(payload))
-                    except json.JSONDecodeError:
-                        continue
-        if len(results) == 1:
-            return results[0]
-        elif len(results) > 1:
-            return results
-        return None
-
-    async def _post_jsonrpc(self, msg: dict) -> dict:
-        """POST a JSON-RPC message and parse the response."""
+        results: list[JsonRpcResponse] = []
+        # Prefix a newline so a data: line at offset 0 matches too
+        body = b"\n" + body
+        pos = 0
+        while (pos := body.find(_SSE_DATA, pos)) >= 0:
+            start = pos + len(_SSE_DATA)
+            pos = body.find(b"\n", start)
+            if pos < 0:
+                pos = len(body)
+            payload = body[start:pos].strip()
+            if not payload:
+                continue
+            try:
+                frame = _decode_reply(payload)
+            except msgspec.DecodeError:
+                continue
+            if isinstance(frame, list):
+                results.extend(frame)
+            else:
+                results.append(frame)
+        return _one_or_many(results)
+
+    async def _post_payload(self, payload: dict | list[dict]) -> JsonRpcResponse | list[JsonRpcResponse]:
+        """POST a JSON-RPC message or batch and return the decoded response body."""
         if not self._client:
             raise MCPConnectionError("HTTP client not initialized — call connect() first")
 
-        url = self._request_url()
-        headers = {
-            "Content-Type": "application/json",
-            "Accept": "application/json, text/event-stream",
-        }
-        # Include session ID for stateful Streamable HTTP (required after initialize)
-        if self._session_id:
-            headers["Mcp-Session-Id"] = self._session_id
+        url = self._rpc_url
+        msgs = payload if isinstance(payload, list) else (payload,)
+        expected = {msg["id"] for msg in msgs if "id" in msg}
 
         try:
-            response = await self._client.post(url, json=msg, headers=headers)
-            response.raise_for_status()
+            # Session ID (required after initialize) is a client default header
+            async with self._inflight_limit, self._client.stream(
+                "POST", url, content=_dumps(payload)
+            ) as response:
+                if response.is_error:
+                    await response.aread()
+                    response.raise_for_status()
+                self._capture_session_id(response)
+                if response.headers.get("content-type", "").startswith("text/event-stream"):
+                    data = await self._read_sse_stream(response, expected)
+                    if data is None:
+                        raise MCPError("No JSON-RPC reply in SSE stream from Vestige")
+                    return data
+                body = await response.aread()
         except httpx.ConnectError as exc:
             self._connected = False
             raise MCPConnectionError(f"Cannot reach Vestige at {url}: {exc}") from exc
         except httpx.TimeoutException as exc:
             raise MCPConnectionError(f"Timeout communicating with Vestige at {url}: {exc}") from exc
         except httpx.HTTPStatusError as exc:
-            raise MCPError(f"Vestige returned HTTP {exc.response.status_code}: {exc.response.text}") from exc
+            status = exc.response.status_code
+            message = f"Vestige returned HTTP {status}: {exc.response.text}"
+            # Streamable HTTP answers 404 for an expired session; the
+            # handshake must be redone. Any other 4xx means the request was
+            # refused (e.g. a batch the server does not accept) rather than
+            # run, so it is safe to resend in another form.
+            if status == 404 and self._session_id:
+                raise MCPSessionError(message) from exc
+            if 400 <= status < 500 and status != 404:
+                raise MCPRejectedError(message) from exc
+            raise MCPError(message) from exc
 
-        # Capture session ID from response (set by vestige-mcp for stateful sessions)
+        # Parse response — handle both JSON and SSE formats. A JSON-RPC body
+        # starts with '{' or '[' (after any whitespace); anything else (or JSON
+        # that fails to decode, e.g. a mislabelled SSE stream) goes through the
+        # SSE frame parser.
+        error: Exception | None = None
+        if body.lstrip()[:1] in _JSON_START:
+            try:
+                return _decode_reply(body)
+            except msgspec.DecodeError as exc:
+                error = exc
+        data = self._parse_sse_json(body)
+        if data is None:
+            raise MCPError(f"Invalid JSON from Vestige: {body[:200].decode(errors='replace')}") from error
+        return data
+
+    @staticmethod
+    async def _read_sse_stream(
+        response: httpx.Response, expected: set
+    ) -> JsonRpcResponse | list[JsonRpcResponse] | None:
+        """Decode SSE ``data:`` frames as they arrive.
+
+        Stops reading once every id in ``expected`` has a reply, so neither
+        the whole body nor its decoded text is ever held in memory.
+        """
+        results: list[JsonRpcResponse] = []
+        async for line in response.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            try:
+                frame = _decode_reply(line[5:].strip())
+            except msgspec.DecodeError:
+                continue
+            frames = frame if isinstance(frame, list) else (frame,)
+            results.extend(frames)
+            expected.difference_update(f.id for f in frames)
+            if not expected:
+                break
+        return _one_or_many(results)
+
+    def _capture_session_id(self, response: httpx.Response) -> None:
+        """Record the session ID vestige-mcp sets for stateful sessions."""
         session_id = response.headers.get("mcp-session-id")
         if session_id:
             if self._session_id and self._session_id != session_id:
                 logger.info("MCP session ID changed: %s → %s", self._session_id, session_id)
-            self._session_id = session_id
-
-        # Parse response — handle both JSON and SSE formats
-        content_type = response.headers.get("content-type", "")
-        data = None
+            self._set_session_id(session_id)
 
-        if "text/event-stream" in content_type:
-            # SSE-formatted response (legacy supergateway or explicit SSE request)
-            data = self._parse_sse_json(response.text)
-            if data is None:
-                raise MCPError(f"No JSON data found in SSE response: {response.text[:200]}")
-        else:
-            # Standard JSON response
-            try:
-                data = response.json()
-            except Exception as exc:
-                # Last resort: try SSE parsing in case content-type is wrong
-                data = self._parse_sse_json(response.text)
-                if data is None:
-                    raise MCPError(f"Invalid JSON from Vestige: {response.text[:200]}") from exc
+    async def _post_jsonrpc(self, msg: dict) -> msgspec.Raw:
+        """POST a JSON-RPC message and return the raw ``result`` of the reply."""
+        data = await self._post_payload(msg)
 
         # Handle JSON-RPC batch or single response
         # Streamable HTTP may return an array; pick the response matching our id
         if isinstance(data, list):
-            for item in data:
-                if item.get("id") == msg.get("id"):
-                    data = item
-                    break
-            else:
-                # No matching id — use the first result-bearing item
-                for item in data:
-                    if "result" in item:
-                        data = item
-                        break
-                else:
-                    raise MCPError(f"No matching response in batch: {data}")
-
-        if "error" in data:
-            err = data["error"]
+            by_id = {item.id: item for item in data if item.id is not None}
+            # No matching id — use the first result-bearing item
+            data = by_id.get(msg.get("id")) or next((item for item in data if item.result), None)
+            if data is None:
+                raise MCPError(f"No matching response in batch: {by_id}")
+
+        return self._unwrap(data)
+
+    async def _post_jsonrpc_batch(self, msgs: list[dict]) -> dict[Any, JsonRpcResponse]:
+        """POST several JSON-RPC messages as one batch and return replies by id.
+
+        Notifications in the batch produce no reply.
+        """
+        data = await self._post_payload(msgs)
+        if not isinstance(data, list) and data.id is None and data.error is not None:
+            # A lone id-less error answers the batch as a whole; -32600
+            # (Invalid Request) is how servers without batch support reply
+            if data.error.get("code") == _INVALID_REQUEST:
+                raise MCPRejectedError(f"Batch rejected by Vestige: {data.error.get('message')}")
+        # Replies without an id (e.g. a parse error) cannot belong to a caller
+        return {
+            item.id: item
+            for item in (data if isinstance(data, list) else [data])
+            if item.id is not None
+        }
+
+    @staticmethod
+    def _unwrap(data: JsonRpcResponse) -> msgspec.Raw:
+        """Return the raw ``result`` of a JSON-RPC reply, raising on ``error``."""
+        if data.error is not None:
+            err = data.error
             raise MCPError(f"MCP error {err.get('code')}: {err.get('message')}")
+        return data.result
 
-        return data.get("result", {})
+    @staticmethod
+    def _decode_result(raw: msgspec.Raw) -> dict:
+        """Decode a raw ``result`` into plain Python objects."""
+        return (_decode_any(raw) or {}) if raw else {}
 
     async def _post_jsonrpc_notification(self, msg: dict) -> None:
         """POST a JSON-RPC notification (fire-and-forget)."""
         if not self._client:
             raise MCPConnectionError("HTTP client not initialized — call connect() first")
 
-        url = self._request_url()
-        headers = {
-            "Content-Type": "application/json",
-            "Accept": "application/json, text/event-stream",
-        }
-        if self._session_id:
-            headers["Mcp-Session-Id"] = self._session_id
+        url = self._rpc_url
 
         try:
-            response = await self._client.post(url, json=msg, headers=headers)
+            response = await self._client.post(url, content=_dumps(msg))
             # Capture session ID if present
             sid = response.headers.get("mcp-session-id")
             if sid:
-                self._session_id = sid
+                self._set_session_id(sid)
             # Notifications may return 200 or 202, both are fine
             if response.status_code >= 400:
                 logger.warning("Notification returned HTTP %d: %s", response.status_code, response.text[:200])
@@ -324,6 +880,18 @@ class MCPClient:
         except httpx.TimeoutException as exc:
             raise MCPConnectionError(f"Timeout sending notification to Vestige: {exc}") from exc
 
+    def _set_session_id(self, session_id: str | None) -> None:
+        """Record the MCP session ID and update the client's default headers."""
+        if session_id == self._session_id:
+            return
+        self._session_id = session_id
+        if self._client is None:
+            return
+        if session_id:
+            self._client.headers["Mcp-Session-Id"] = session_id
+        else:
+            self._client.headers.pop("Mcp-Session-Id", None)
+
     def _request_url(self) -> str:
         """Return the URL for sending JSON-RPC requests based on transport mode."""
         if self.transport == "sse":
@@ -337,6 +905,113 @@ class MCPClient:
         return self.url
 
 
+class MCPHost:
+    """Connects to several MCP servers at once and routes tool calls by name.
+
+    ``connect_all`` opens every session concurrently, so startup takes as
+    long as the slowest server rather than the sum of all of them. When two
+    servers expose the same tool, the one listed first wins.
+    """
+
+    def __init__(self, client_factory: Callable[..., MCPClient] = MCPClient):
+        self._client_factory = client_factory
+        self._stack = AsyncExitStack()
+        self.sessions: dict[str, MCPClient] = {}
+        self.tool_registry: dict[str, MCPClient] = {}
+
+    async def __aenter__(self) -> MCPHost:
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.aclose()
+
+    async def connect_all(self, configs: dict[str, dict[str, Any]]) -> None:
+        """Connect to each server in ``configs`` (name -> MCPClient kwargs).
+
+        If any server fails, every session opened so far is closed and the
+        first error is raised.
+        """
+        results = await asyncio.gather(
+            *(self._connect_one(name, cfg) for name, cfg in configs.items()),
+            return_exceptions=True,
+        )
+        errors = [r for r in results if isinstance(r, BaseException)]
+        if errors:
+            await self.aclose()
+            raise errors[0]
+        # Merge after gather so precedence follows config order, not timing
+        for name in configs:
+            client = self.sessions[name]
+            for tool in client.tool_names:
+                owner = self.tool_registry.setdefault(tool, client)
+                if owner is not client:
+                    logger.warning("Tool %s on %s is shadowed by an earlier server", tool, name)
+
+    async def _connect_one(self, name: str, cfg: dict[str, Any]) -> None:
+        client = self._client_factory(**cfg)
+        try:
+            await client.connect()
+        except BaseException:
+            # connect() may have opened the HTTP client before failing
+            await client.disconnect()
+            raise
+        self.sessions[name] = client
+        self._stack.push_async_callback(client.disconnect)
+
+    async def call_tool(self, name: str, arguments: dict[str, Any], coalesce: bool = True) -> Any:
+        """Call ``name`` on whichever server provides it."""
+        client = self.tool_registry.get(name)
+        if client is None:
+            raise MCPToolError(f"Unknown tool: {name}")
+        return await client.call_tool(name, arguments, coalesce=coalesce)
+
+    async def aclose(self) -> None:
+        """Disconnect every session."""
+        await self._stack.aclose()
+        self.sessions.clear()
+        self.tool_registry.clear()
+
+
+def _one_or_many(results: list[JsonRpcResponse]) -> JsonRpcResponse | list[JsonRpcResponse] | None:
+    """Collapse decoded SSE frames into the shape a JSON body would have."""
+    if len(results) == 1:
+        return results[0]
+    elif len(results) > 1:
+        return results
+    return None
+
+
+class _LazyJoin:
+    """Defers ``", ".join(items)`` until a log handler formats the record."""
+
+    __slots__ = ("items",)
+
+    def __init__(self, items: list[str]):
+        self.items = items
+
+    def __str__(self) -> str:
+        return ", ".join(self.items)
+
+
+def _resolve_refs(value: Any, results: dict[str, Any]) -> Any:
+    """Substitute ``{"$ref": "step_id.path"}`` objects with earlier step results."""
+    if isinstance(value, dict):
+        ref = value.get("$ref")
+        if isinstance(ref, str) and len(value) == 1:
+            step_id, _, path = ref.partition(".")
+            try:
+                target = results[step_id]
+                for part in path.split(".") if path else ():
+                    target = target[int(part)] if isinstance(target, list) else target[part]
+            except (KeyError, IndexError, ValueError, TypeError) as exc:
+                raise MCPError(f"Cannot resolve plan reference {ref!r}") from exc
+            return target
+        return {k: _resolve_refs(v, results) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_resolve_refs(v, results) for v in value]
+    return value
+
+
 class MCPError(Exception):
     pass
 
@@ -345,5 +1020,13 @@ class MCPConnectionError(MCPError):
     pass
 
 
+class MCPSessionError(MCPError):
+    pass
+
+
 class MCPToolError(MCPError):
     pass
+
+
+class MCPRejectedError(MCPError):
+    pass
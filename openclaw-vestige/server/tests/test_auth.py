@@ -14,9 +14,9 @@ def _make_app(
     token: str | None = None,
     allow_anonymous: bool = False,
 ) -> TestClient:
-    """Create a test app with the auth middleware and given env configuration."""
+    """Create a test app with the auth middleware configured explicitly."""
     app = FastAPI()
-    app.add_middleware(BearerAuthMiddleware)
+    app.add_middleware(BearerAuthMiddleware, token=token, allow_anonymous=allow_anonymous)
 
     @app.get("/health")
     async def health():
@@ -30,15 +30,10 @@ def _make_app(
     async def protected():
         return PlainTextResponse("secret")
 
-    # Clean env
+    # Clean env so the explicit configuration is all the middleware sees
     os.environ.pop("VESTIGE_AUTH_TOKEN", None)
     os.environ.pop("VESTIGE_ALLOW_ANONYMOUS", None)
 
-    if token is not None:
-        os.environ["VESTIGE_AUTH_TOKEN"] = token
-    if allow_anonymous:
-        os.environ["VESTIGE_ALLOW_ANONYMOUS"] = "true"
-
     return TestClient(app)
 
 
@@ -84,6 +79,13 @@ def test_readyz_bypasses_auth():
     assert resp.status_code == 200
 
 
+def test_health_bypasses_unconfigured_auth():
+    """Probes stay reachable even before auth is configured."""
+    client = _make_app(token=None, allow_anonymous=False)
+    resp = client.get("/health")
+    assert resp.status_code == 200
+
+
 def test_missing_header_returns_401():
     client = _make_app(token="secret123")
     resp = client.get("/protected")
@@ -100,3 +102,63 @@ def test_correct_token_passes():
     client = _make_app(token="secret123")
     resp = client.get("/protected", headers={"Authorization": "Bearer secret123"})
     assert resp.status_code == 200
+
+
+def _make_env_app() -> TestClient:
+    """Create a test app whose auth middleware reads the environment, as in production."""
+    app = FastAPI()
+    app.add_middleware(BearerAuthMiddleware)
+
+    @app.get("/protected")
+    async def protected():
+        return PlainTextResponse("secret")
+
+    return TestClient(app)
+
+
+def test_token_read_from_env_by_default(monkeypatch):
+    monkeypatch.setenv("VESTIGE_AUTH_TOKEN", "from-env")
+    client = _make_env_app()
+    assert client.get("/protected").status_code == 401
+    resp = client.get("/protected", headers={"Authorization": "Bearer from-env"})
+    assert resp.status_code == 200
+
+
+def test_empty_env_token_returns_500(monkeypatch):
+    """An empty VESTIGE_AUTH_TOKEN is misconfiguration, even with anonymous access on."""
+    monkeypatch.setenv("VESTIGE_AUTH_TOKEN", "")
+    monkeypatch.setenv("VESTIGE_ALLOW_ANONYMOUS", "true")
+    resp = _make_env_app().get("/protected")
+    assert resp.status_code == 500
+    assert "empty" in resp.json()["detail"]
+
+
+def test_env_allow_anonymous_without_token(monkeypatch):
+    monkeypatch.delenv("VESTIGE_AUTH_TOKEN", raising=False)
+    monkeypatch.setenv("VESTIGE_ALLOW_ANONYMOUS", "true")
+    assert _make_env_app().get("/protected").status_code == 200
+
+
+def test_env_without_token_or_anonymous_returns_500(monkeypatch):
+    monkeypatch.delenv("VESTIGE_AUTH_TOKEN", raising=False)
+    monkeypatch.delenv("VESTIGE_ALLOW_ANONYMOUS", raising=False)
+    resp = _make_env_app().get("/protected")
+    assert resp.status_code == 500
+    assert "VESTIGE_AUTH_TOKEN" in resp.json()["detail"]
+
+
+@pytest.mark.parametrize("reload", [True, False])
+def test_auth_reload_picks_up_token_changes(monkeypatch, reload):
+    if reload:
+        monkeypatch.setenv("VESTIGE_AUTH_RELOAD", "1")
+    else:
+        monkeypatch.delenv("VESTIGE_AUTH_RELOAD", raising=False)
+    monkeypatch.setenv("VESTIGE_AUTH_TOKEN", "old")
+    client = _make_env_app()
+    # The middleware is built on the first request, reading the env then
+    assert client.get("/protected", headers={"Authorization": "Bearer old"}).status_code == 200
+
+    monkeypatch.setenv("VESTIGE_AUTH_TOKEN", "new")
+    new = client.get("/protected", headers={"Authorization": "Bearer new"})
+    old = client.get("/protected", headers={"Authorization": "Bearer old"})
+    assert (new.status_code, old.status_code) == ((200, 401) if reload else (401, 200))
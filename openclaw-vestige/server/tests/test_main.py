@@ -0,0 +1,88 @@
+"""Tests for the HTTP endpoints' translation into MCP tool calls."""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+from app.mcp_client import MCPToolError
+
+
+@pytest.fixture()
+def calls(monkeypatch):
+    """Record tool calls instead of talking to Vestige."""
+    recorded: list = []
+
+    async def fake_call_tool(name, arguments, coalesce=True):
+        recorded.append((name, arguments))
+        return {"content": [{"type": "text", "text": "ok"}]}
+
+    monkeypatch.setenv("VESTIGE_ALLOW_ANONYMOUS", "true")
+    monkeypatch.delenv("VESTIGE_AUTH_TOKEN", raising=False)
+    monkeypatch.setattr(main.mcp, "call_tool", fake_call_tool)
+    return recorded
+
+
+@pytest.fixture()
+def client(calls):
+    # Not used as a context manager, so the lifespan (MCP connect) is skipped
+    return TestClient(main.app)
+
+
+def test_search_args(client, calls):
+    resp = client.post("/search", json={"query": "hello", "mode": "keyword"})
+    assert resp.status_code == 200
+    assert resp.json()["success"] is True
+    assert calls == [("search", {"query": "hello", "mode": "keyword", "limit": 10})]
+
+
+def test_ingest_merges_agent_context(client, calls):
+    client.post(
+        "/ingest",
+        json={"content": "x", "context": "ctx"},
+        headers={"X-Agent-Id": "bot"},
+    )
+    name, args = calls[0]
+    assert name == "ingest"
+    assert args == {
+        "content": "x",
+        "node_type": "fact",
+        "tags": [],
+        "context": "agent:bot | ctx",
+        "agent_id": "bot",
+    }
+
+
+def test_memory_action_value(client, calls):
+    client.post("/memory", json={"action": "get", "memory_id": "m1"})
+    assert calls == [("memory", {"action": "get", "memory_id": "m1"})]
+
+
+def test_intention_without_trigger(client, calls):
+    client.post("/intention", json={"content": "remind me"}, headers={"X-Agent-Id": "bot"})
+    assert calls == [
+        (
+            "intention",
+            {"content": "remind me", "tags": [], "agent_id": "bot", "context": "agent:bot"},
+        )
+    ]
+
+
+def test_intention_drops_empty_trigger(client, calls):
+    client.post("/intention", json={"content": "remind me", "trigger": ""})
+    assert "trigger" not in calls[0][1]
+
+
+@pytest.mark.parametrize("path", ["/ingest", "/smart_ingest", "/codebase"])
+def test_empty_context_is_dropped(client, calls, path):
+    client.post(path, json={"content": "x", "context": ""})
+    assert "context" not in calls[0][1]
+
+
+def test_tool_error_envelope(client, monkeypatch):
+    async def failing_call_tool(name, arguments, coalesce=True):
+        raise MCPToolError("boom")
+
+    monkeypatch.setattr(main.mcp, "call_tool", failing_call_tool)
+    resp = client.post("/search", json={"query": "hello"})
+    assert resp.status_code == 200
+    assert resp.json() == {"success": False, "data": None, "error": "boom"}
@@ -0,0 +1,531 @@
+"""Tests for the MCP JSON-RPC client against an in-process fake server."""
+
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app import mcp_client
+from app.mcp_client import MCPClient, MCPConnectionError, MCPError, MCPHost, MCPSessionError, MCPToolError
+
+
+class FakeVestige:
+    """Minimal Streamable HTTP MCP server backed by ``httpx.MockTransport``."""
+
+    def __init__(
+        self,
+        batch: bool = True,
+        advertise_tools: bool = False,
+        sse: bool = False,
+        tools: tuple = ("search", "ingest"),
+        batch_status: int = 400,
+    ):
+        self.batch = batch
+        # Status returned for batch POSTs when batch=False
+        self.batch_status = batch_status
+        self.tools = [{"name": name} for name in tools]
+        self.sse = sse
+        self.advertise_tools = advertise_tools
+        self.requests: list = []
+        self.expired_sessions: set = set()
+        self.sessions = 0
+
+    def _reply(self, msg: dict) -> dict | None:
+        if "id" not in msg:
+            return None
+        method = msg["method"]
+        if method == "initialize":
+            result = {
+                "protocolVersion": "2025-03-26",
+                "capabilities": {"tools": {"listChanged": False}},
+                "serverInfo": {"name": "vestige", "version": "1.0.0"},
+            }
+            if self.advertise_tools:
+                result["capabilities"]["tools"] = self.tools
+        elif method == "tools/list":
+            result = {"tools": self.tools}
+        elif msg["params"]["name"] == "fail":
+            result = {"isError": True, "content": [{"type": "text", "text": "boom"}]}
+        else:
+            text = json.dumps(msg["params"]["arguments"])
+            result = {"content": [{"type": "text", "text": text}]}
+        return {"jsonrpc": "2.0", "id": msg["id"], "result": result}
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        self.requests.append(body)
+        if request.headers.get("mcp-session-id") in self.expired_sessions:
+            return httpx.Response(404, text="Not Found")
+        if isinstance(body, dict) and body.get("method") == "initialize":
+            self.sessions += 1
+        headers = {"mcp-session-id": f"sess-{self.sessions}"}
+        if isinstance(body, list):
+            if not self.batch:
+                return httpx.Response(self.batch_status, text="batches not supported")
+            replies = [r for r in map(self._reply, body) if r]
+            return httpx.Response(200, json=replies, headers=headers)
+        reply = self._reply(body)
+        if reply is None:
+            return httpx.Response(202, headers=headers)
+        if self.sse:
+            headers["content-type"] = "text/event-stream"
+            frame = f"event: message\ndata: {json.dumps(reply)}\n\n"
+            return httpx.Response(200, text=": ping\n\n" + frame, headers=headers)
+        return httpx.Response(200, json=reply, headers=headers)
+
+    @property
+    def methods(self) -> list:
+        return [
+            [m["method"] for m in body] if isinstance(body, list) else body["method"]
+            for body in self.requests
+        ]
+
+
+@pytest.fixture(autouse=True)
+def _no_tool_cache(monkeypatch):
+    monkeypatch.setattr(mcp_client, "TOOL_CACHE_PATH", "")
+
+
+def _make_client(server: FakeVestige, **kwargs) -> MCPClient:
+    client = MCPClient(url="http://vestige.test/mcp", **kwargs)
+    client._new_client = lambda: httpx.AsyncClient(transport=httpx.MockTransport(server.handler))
+    return client
+
+
+@pytest.mark.asyncio
+async def test_connect_batches_handshake():
+    server = FakeVestige()
+    client = _make_client(server)
+    await client.connect()
+    assert client.tool_names == ["search", "ingest"]
+    assert server.methods == ["initialize", ["notifications/initialized", "tools/list"]]
+    await client.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_connect_falls_back_without_batch_support():
+    server = FakeVestige(batch=False)
+    client = _make_client(server)
+    await client.connect()
+    assert client.tool_names == ["search", "ingest"]
+    assert server.methods[-2:] == ["notifications/initialized", "tools/list"]
+    await client.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_connect_uses_advertised_tools():
+    server = FakeVestige(advertise_tools=True)
+    client = _make_client(server)
+    await client.connect()
+    assert client.tool_names == ["search", "ingest"]
+    assert server.methods == ["initialize", "notifications/initialized"]
+    await client.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_call_tool_returns_content():
+    client = _make_client(FakeVestige())
+    await client.connect()
+    result = await client.call_tool("search", {"query": "hello"})
+    assert result == {"content": [{"type": "text", "text": '{"query": "hello"}'}]}
+    await client.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_call_tool_reads_sse_stream():
+    client = _make_client(FakeVestige(sse=True))
+    await client.connect()
+    result = await client.call_tool("search", {"query": "hello"})
+    assert result == {"content": [{"type": "text", "text": '{"query": "hello"}'}]}
+    await client.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_call_tool_accepts_json_with_leading_whitespace():
+    server = FakeVestige(advertise_tools=True)
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        response = server.handler(request)
+        headers = {k: v for k, v in response.headers.items() if k == "mcp-session-id"}
+        return httpx.Response(response.status_code, content=b"\r\n  " + response.content, headers=headers)
+
+    client = _make_client(server)
+    client._new_client = lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    await client.connect()
+    result = await client.call_tool("search", {"query": "x"})
+    assert result["content"][0]["text"] == '{"query": "x"}'
+    await client.disconnect()
+
+
+def test_parse_sse_json_extracts_data_lines():
+    body = (
+        b'data: {"jsonrpc":"2.0","id":1,"result":{}}\r\n'
+        b"event: message\n"
+        b"data:\n"
+        b'data:[{"jsonrpc":"2.0","id":2},{"jsonrpc":"2.0","id":3}]'
+    )
+    frames = MCPClient._parse_sse_json(body)
+    assert [f.id for f in frames] == [1, 2, 3]
+    assert MCPClient._parse_sse_json(b"event: ping\n\n") is None
+
+
+@pytest.mark.asyncio
+async def test_call_tool_error_raises():
+    client = _make_client(FakeVestige())
+    await client.connect()
+    with pytest.raises(MCPToolError, match="boom"):
+        await client.call_tool("fail", {})
+    await client.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_call_tool_reconnects_on_expired_session():
+    server = FakeVestige()
+    client = _make_client(server)
+    await client.connect()
+    server.expired_sessions.add("sess-1")
+    result = await client.call_tool("search", {"query": "x"})
+    assert result["content"][0]["text"] == '{"query": "x"}'
+    assert server.methods.count("initialize") == 2
+    await client.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_reconnect_drops_expired_session_id():
+    server = FakeVestige()
+    client = _make_client(server)
+    await client.connect()
+    server.expired_sessions.add("sess-1")
+    client._connected = False
+    result = await client.call_tool("search", {"query": "x"})
+    assert result["content"][0]["text"] == '{"query": "x"}'
+    assert server.methods.count("initialize") == 2
+    await client.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_rejected_request_is_not_a_session_error():
+    server = FakeVestige(batch=False)
+    client = _make_client(server)
+    await client.connect()
+    with pytest.raises(MCPError, match="HTTP 400") as excinfo:
+        await client._post_jsonrpc_batch([client._next_request("tools/list", {})])
+    assert not isinstance(excinfo.value, MCPSessionError)
+    assert server.methods.count("initialize") == 1
+    await client.disconnect()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("batch_window", [None, 0])
+async def test_concurrent_stale_calls_reconnect_once(batch_window):
+    server = FakeVestige()
+    client = _make_client(server, batch_window=batch_window)
+    await client.connect()
+    server.expired_sessions.add("sess-1")
+    results = await client.call_tools_many([("search", {"n": i}) for i in range(5)])
+    assert [r["content"][0]["text"] for r in results] == [f'{{"n": {i}}}' for i in range(5)]
+    assert server.methods.count("initialize") == 2
+    await client.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_call_tools_many_preserves_order():
+    client = _make_client(FakeVestige())
+    await client.connect()
+    results = await client.call_tools_many([("search", {"n": i}) for i in range(5)])
+    assert [r["content"][0]["text"] for r in results] == [f'{{"n": {i}}}' for i in range(5)]
+    await client.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_call_tools_many_sends_duplicate_calls():
+    server = FakeVestige()
+    client = _make_client(server)
+    await client.connect()
+    await client.call_tools_many([("ingest", {"content": "x"}), ("ingest", {"content": "x"})])
+    assert server.methods.count("tools/call") == 2
+    await client.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_identical_concurrent_calls_are_coalesced():
+    server = FakeVestige()
+    client = _make_client(server)
+    await client.connect()
+    a, b = await asyncio.gather(
+        client.call_tool("search", {"query": "x", "limit": 1}),
+        client.call_tool("search", {"limit": 1, "query": "x"}),
+    )
+    assert a == b
+    assert server.methods.count("tools/call") == 1
+    await client.call_tool("search", {"query": "x", "limit": 1}, coalesce=False)
+    assert server.methods.count("tools/call") == 2
+    await client.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_cacheable_tool_results_are_reused():
+    server = FakeVestige()
+    client = _make_client(server, cacheable=frozenset({"search"}), cache_ttl=60)
+    await client.connect()
+    first = await client.call_tool("search", {"query": "x"})
+    assert await client.call_tool("search", {"query": "x"}) == first
+    assert server.methods.count("tools/call") == 1
+    await client.call_tool("ingest", {"content": "x"}, coalesce=False)
+    await client.call_tool("ingest", {"content": "x"}, coalesce=False)
+    assert server.methods.count("tools/call") == 3
+
+    client._cache_ttl = 0
+    await client.call_tool("search", {"query": "x"})
+    assert server.methods.count("tools/call") == 4
+    await client.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_a_batch_post():
+    server = FakeVestige()
+    client = _make_client(server, batch_window=0)
+    await client.connect()
+    results = await client.call_tools_many([("search", {"n": i}) for i in range(3)])
+    assert [r["content"][0]["text"] for r in results] == [f'{{"n": {i}}}' for i in range(3)]
+    assert server.methods[-1] == ["tools/call"] * 3
+    await client.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_rejected_batch_post_falls_back_to_single_requests():
+    server = FakeVestige(advertise_tools=True, batch=False)
+    client = _make_client(server, batch_window=0)
+    await client.connect()
+    results = await client.call_tools_many([("search", {"n": i}) for i in range(3)])
+    assert [r["content"][0]["text"] for r in results] == [f'{{"n": {i}}}' for i in range(3)]
+    assert server.methods[-3:] == ["tools/call"] * 3
+    assert server.methods.count("initialize") == 1
+    assert client._batch_window is None
+    await client.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_post_is_not_resent():
+    server = FakeVestige(advertise_tools=True, batch=False, batch_status=503)
+    client = _make_client(server, batch_window=0)
+    await client.connect()
+    with pytest.raises(MCPError, match="HTTP 503"):
+        await client.call_tools_many([("ingest", {"n": i}) for i in range(3)])
+    assert server.methods[-1] == ["tools/call"] * 3
+    assert "tools/call" not in server.methods
+    assert client._batch_window == 0
+    await client.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_invalid_request_batch_reply_falls_back():
+    server = FakeVestige(advertise_tools=True)
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if isinstance(json.loads(request.content), list):
+            error = {"code": -32600, "message": "Batch not supported"}
+            return httpx.Response(200, json={"jsonrpc": "2.0", "id": None, "error": error})
+        return server.handler(request)
+
+    client = _make_client(server, batch_window=0)
+    client._new_client = lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    await client.connect()
+    results = await client.call_tools_many([("search", {"n": i}) for i in range(2)])
+    assert [r["content"][0]["text"] for r in results] == [f'{{"n": {i}}}' for i in range(2)]
+    assert server.methods[-2:] == ["tools/call"] * 2
+    assert client._batch_window is None
+    await client.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_call_tools_sends_one_batch():
+    server = FakeVestige()
+    client = _make_client(server)
+    await client.connect()
+    results = await client.call_tools([("search", {"n": i}) for i in range(3)])
+    assert [r["content"][0]["text"] for r in results] == [f'{{"n": {i}}}' for i in range(3)]
+    assert server.methods[-1] == ["tools/call"] * 3
+    await client.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_call_tools_falls_back_without_batch_support():
+    server = FakeVestige(batch=False)
+    client = _make_client(server)
+    await client.connect()
+    results = await client.call_tools([("search", {"n": i}) for i in range(3)])
+    assert [r["content"][0]["text"] for r in results] == [f'{{"n": {i}}}' for i in range(3)]
+    assert server.methods[-3:] == ["tools/call"] * 3
+    await client.disconnect()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("batch", [True, False])
+async def test_call_tools_does_not_coalesce_duplicates(batch):
+    server = FakeVestige(batch=batch, advertise_tools=True)
+    client = _make_client(server)
+    await client.connect()
+    await client.call_tools([("ingest", {"content": "x"}), ("ingest", {"content": "x"})])
+    if batch:
+        assert server.methods[-1] == ["tools/call"] * 2
+    else:
+        assert server.methods[-2:] == ["tools/call"] * 2
+    await client.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_call_tools_does_not_resend_failed_batch():
+    server = FakeVestige(advertise_tools=True, batch=False, batch_status=503)
+    client = _make_client(server)
+    await client.connect()
+    with pytest.raises(MCPError, match="HTTP 503"):
+        await client.call_tools([("ingest", {"content": "x"}), ("ingest", {"content": "y"})])
+    assert "tools/call" not in server.methods
+    await client.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_call_tools_renews_expired_session():
+    server = FakeVestige()
+    client = _make_client(server)
+    await client.connect()
+    server.expired_sessions.add("sess-1")
+    results = await client.call_tools([("search", {"n": 1}), ("search", {"n": 2})])
+    assert [r["content"][0]["text"] for r in results] == ['{"n": 1}', '{"n": 2}']
+    assert server.methods.count("initialize") == 2
+    assert server.methods[-1] == ["tools/call"] * 2
+    await client.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_call_tools_plan_resolves_refs():
+    server = FakeVestige()
+    client = _make_client(server)
+    await client.connect()
+    results = await client.call_tools_plan([
+        {"id": "a", "name": "search", "arguments": {"query": "x"}},
+        {"id": "b", "name": "search", "arguments": {"query": "y"}},
+        {
+            "id": "c",
+            "name": "ingest",
+            "arguments": {"content": {"$ref": "a.content.0.text"}},
+            "deps": ["a", "b"],
+        },
+    ])
+    assert results["c"]["content"][0]["text"] == json.dumps({"content": '{"query": "x"}'})
+    await client.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_call_tools_plan_rejects_unknown_deps():
+    client = _make_client(FakeVestige())
+    with pytest.raises(ValueError):
+        await client.call_tools_plan([{"id": "a", "name": "search", "arguments": {}, "deps": ["z"]}])
+
+
+@pytest.mark.asyncio
+async def test_initialized_notification_precedes_tool_calls(monkeypatch, tmp_path):
+    monkeypatch.setattr(mcp_client, "TOOL_CACHE_PATH", str(tmp_path / "tools.json"))
+    first = _make_client(FakeVestige())
+    await first.connect()
+    await first.disconnect()
+
+    server = FakeVestige()
+    second = _make_client(server)
+    await second.connect()
+    await second.call_tool("search", {"query": "x"})
+    assert server.methods == ["initialize", "notifications/initialized", "tools/call"]
+    await second.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_health_check_connects_lazily():
+    server = FakeVestige()
+    client = _make_client(server)
+    assert await client.health_check() is True
+    assert client.alive
+    assert server.methods[0] == "initialize"
+    await client.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_unchanged_tools_list_is_not_reparsed(monkeypatch):
+    server = FakeVestige()
+    client = _make_client(server)
+    await client.connect()
+    parsed = []
+    monkeypatch.setattr(client, "_set_tool_names", parsed.append)
+    assert await client.health_check() is True
+    assert parsed == []
+
+    server.tools.append({"name": "codebase"})
+    assert await client.health_check() is True
+    assert parsed == [{"tools": server.tools}]
+    await client.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_tool_cache_skips_tools_list(monkeypatch, tmp_path):
+    monkeypatch.setattr(mcp_client, "TOOL_CACHE_PATH", str(tmp_path / "tools.json"))
+    first = _make_client(FakeVestige())
+    await first.connect()
+    await first.disconnect()
+
+    server = FakeVestige()
+    second = _make_client(server)
+    await second.connect()
+    assert second.tool_names == ["search", "ingest"]
+    assert server.methods == ["initialize", "notifications/initialized"]
+    await second.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_host_routes_calls_by_tool_name():
+    servers = {
+        "memory": FakeVestige(tools=("search", "ingest")),
+        "code": FakeVestige(tools=("codebase", "search")),
+    }
+
+    def factory(url):
+        return _make_client(servers[url.rsplit("/", 1)[-1]])
+
+    async with MCPHost(client_factory=factory) as host:
+        await host.connect_all({
+            "memory": {"url": "http://vestige.test/memory"},
+            "code": {"url": "http://vestige.test/code"},
+        })
+        assert sorted(host.tool_registry) == ["codebase", "ingest", "search"]
+        await host.call_tool("codebase", {"q": 1})
+        await host.call_tool("search", {"q": 2})
+        with pytest.raises(MCPToolError):
+            await host.call_tool("missing", {})
+    assert servers["code"].methods.count("tools/call") == 1
+    assert servers["memory"].methods.count("tools/call") == 1
+    assert not host.sessions
+
+
+@pytest.mark.asyncio
+async def test_host_closes_sessions_when_a_server_fails():
+    def down(request: httpx.Request) -> httpx.Response:
+        raise httpx.ConnectError("refused", request=request)
+
+    clients = {}
+
+    def factory(url):
+        name = url.rsplit("/", 1)[-1]
+        client = clients[name] = _make_client(FakeVestige())
+        if name == "down":
+            client._new_client = lambda: httpx.AsyncClient(transport=httpx.MockTransport(down))
+        return client
+
+    host = MCPHost(client_factory=factory)
+    with pytest.raises(MCPConnectionError):
+        await host.connect_all({
+            "memory": {"url": "http://vestige.test/memory"},
+            "down": {"url": "http://vestige.test/down"},
+        })
+    assert not host.sessions
+    assert clients["memory"]._client is None
+    assert clients["down"]._client is None
@@ -1,5 +1,7 @@
 """Basic sanity tests for Pydantic models."""
 
+import pytest
+
 from app.models import (
     CodebaseRequest,
     DemoteRequest,
@@ -16,57 +18,113 @@ from app.models import (
 )
 
 
-def test_search_request_defaults():
-    r = SearchRequest(query="hello")
-    assert r.mode == SearchMode.hybrid
-    assert r.limit == 10
-    assert r.threshold is None
+# Happy-path instances are validated once per module and shared read-only
+
+@pytest.fixture(scope="module")
+def search_default():
+    return SearchRequest(query="hello")
 
 
-def test_search_request_custom():
-    r = SearchRequest(query="q", mode="keyword", limit=5, threshold=0.5)
-    assert r.mode == SearchMode.keyword
-    assert r.limit == 5
+@pytest.fixture(scope="module")
+def ingest_tagged():
+    return IngestRequest(content="x", tags=["a", "b"])
 
 
-def test_ingest_request():
-    r = IngestRequest(content="x", tags=["a", "b"])
-    assert r.node_type == "fact"
-    assert len(r.tags) == 2
+@pytest.fixture(scope="module")
+def promote():
+    return PromoteRequest(memory_id="id1")
 
 
-def test_smart_ingest_request():
-    r = SmartIngestRequest(content="important thing", node_type="concept")
-    assert r.content == "important thing"
+@pytest.fixture(scope="module")
+def demote():
+    return DemoteRequest(memory_id="id2")
 
 
-def test_memory_request():
-    r = MemoryRequest(action=MemoryAction.get, memory_id="abc-123")
-    assert r.action == MemoryAction.get
+def test_search_request_defaults(search_default):
+    r = search_default
+    assert r.mode is SearchMode.hybrid
+    assert (r.limit, r.threshold) == (10, None)
 
 
-def test_promote_demote():
-    p = PromoteRequest(memory_id="id1")
-    d = DemoteRequest(memory_id="id2")
-    assert p.memory_id == "id1"
-    assert d.memory_id == "id2"
+def test_search_request_mode_coercion():
+    r = SearchRequest(query="q", mode="keyword")
+    assert r.mode is SearchMode.keyword
 
 
-def test_codebase_request():
-    r = CodebaseRequest(content="Use dependency injection", pattern_type="decision")
-    assert r.pattern_type == "decision"
+def test_ingest_request(ingest_tagged):
+    r = ingest_tagged
+    assert (r.node_type, r.tags) == ("fact", ["a", "b"])
 
 
-def test_intention_request():
-    r = IntentionRequest(content="remind me to review", trigger="next session")
-    assert r.trigger == "next session"
+def test_promote_demote(promote, demote):
+    assert (promote.memory_id, demote.memory_id) == ("id1", "id2")
 
 
-def test_vestige_response():
-    r = VestigeResponse(success=True, data={"content": [{"type": "text", "text": "ok"}]})
-    assert r.success is True
+# (model, constructor kwargs, expected attribute values)
+MODEL_CASES = [
+    (
+        SearchRequest,
+        {"query": "q", "mode": SearchMode.keyword, "limit": 5, "threshold": 0.5},
+        {"mode": SearchMode.keyword, "limit": 5, "threshold": 0.5},
+    ),
+    (
+        SmartIngestRequest,
+        {"content": "important thing", "node_type": "concept"},
+        {"content": "important thing"},
+    ),
+    (
+        MemoryRequest,
+        {"action": MemoryAction.get, "memory_id": "abc-123"},
+        {"action": MemoryAction.get},
+    ),
+    (
+        CodebaseRequest,
+        {"content": "Use dependency injection", "pattern_type": "decision"},
+        {"pattern_type": "decision"},
+    ),
+    (
+        IntentionRequest,
+        {"content": "remind me to review", "trigger": "next session"},
+        {"trigger": "next session"},
+    ),
+    (
+        VestigeResponse,
+        {"success": True, "data": {"content": [{"type": "text", "text": "ok"}]}},
+        {"success": True},
+    ),
+    (
+        HealthResponse,
+        {"status": "healthy", "vestige_connected": True, "uptime_seconds": 42.5},
+        {"status": "healthy"},
+    ),
+]
 
 
-def test_health_response():
-    r = HealthResponse(status="healthy", vestige_connected=True, uptime_seconds=42.5)
-    assert r.status == "healthy"
+@pytest.mark.parametrize(
+    "cls,kwargs,expected", MODEL_CASES, ids=[case[0].__name__ for case in MODEL_CASES]
+)
+def test_model_fields(cls, kwargs, expected):
+    r = cls(**kwargs)
+    assert {name: getattr(r, name) for name in expected} == expected
+
+
+@pytest.mark.parametrize(
+    "cls",
+    [
+        SearchRequest,
+        IngestRequest,
+        SmartIngestRequest,
+        MemoryRequest,
+        PromoteRequest,
+        DemoteRequest,
+        CodebaseRequest,
+        IntentionRequest,
+        VestigeResponse,
+        HealthResponse,
+    ],
+    ids=lambda cls: cls.__name__,
+)
+def test_no_validate_assignment(cls):
+    # Models are built once per request; validating every attribute write
+    # would slow the hot path for no benefit
+    assert not cls.model_config.get("validate_assignment", False)